@@ -1,16 +1,39 @@
 import streamlit as st
 import requests
+import requests_cache
+import numpy as np
 import pandas as pd
 import yfinance as yf
 import openai
-import matplotlib.pyplot as plt
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import io
+import json
 import logging
 
 
 st.set_page_config(page_title="AI Empowered Investment Toolkit", layout="wide")
 
+# Shared HTTP session: keep-alive connection pooling avoids re-doing the
+# TCP+TLS handshake on every scraper call and across Streamlit reruns, and
+# the sqlite backend persists responses so a fresh container (or a fresh
+# @st.cache_data store) still hits disk instead of the network.
+_SESSION = requests_cache.CachedSession("tradelens_cache", expire_after=3600, backend="sqlite")
+_SESSION.headers.update({"User-Agent": "Mozilla/5.0"})
+_adapter = requests.adapters.HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    # Back off on transient errors instead of failing (or letting the user
+    # mash rerun and amplify load on a struggling upstream).
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
+
+yf.set_tz_cache_location(".cache")
+
 # Replace with your own OpenAI API key
 openai.api_key = st.secrets["OPENAI_API_KEY"]
 
@@ -31,47 +54,84 @@ def fetch_insider_trades(ticker: str) -> pd.DataFrame:
     Fetch recent insider trades from OpenInsider for a given ticker.
     """
     url = f"http://openinsider.com/screener?s={ticker}&o=&pl=&ph=&ll=&lh=&fd=0&td=0&fdlyl=&tdlyl=&daysago=30"
-    headers = {"User-Agent": "Mozilla/5.0"}
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = _SESSION.get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        table = soup.find("table", class_="tinytable")
-        if not table:
+        # pd.read_html parses the table in C (via lxml) and returns a
+        # DataFrame directly - no Python loop over rows and cells. The
+        # StringIO wrapper is required on pandas >= 3.0, which no longer
+        # accepts literal HTML strings.
+        tables = pd.read_html(
+            io.StringIO(response.text), attrs={"class": "tinytable"}, flavor="lxml"
+        )
+        if not tables or tables[0].shape[1] < 13:
             return pd.DataFrame()
-
-        tbody = table.find("tbody")
-        rows = tbody.find_all("tr")
-        all_data = []
-        for row in rows:
-            cols = row.find_all("td")
-            if len(cols) < 13:
-                continue
-            row_data = {
-                "FilingDate": cols[1].get_text(strip=True),
-                "TradeDate": cols[2].get_text(strip=True),
-                "InsiderName": cols[5].get_text(strip=True),
-                "TradeType": cols[7].get_text(strip=True),
-                "SharesTraded": cols[9].get_text(strip=True),
-                "Price": cols[8].get_text(strip=True),
-                "Value": cols[12].get_text(strip=True),
-            }
-            all_data.append(row_data)
-        return pd.DataFrame(all_data)
+        df = tables[0].iloc[:, [1, 2, 5, 7, 9, 8, 12]]
+        df.columns = [
+            "FilingDate",
+            "TradeDate",
+            "InsiderName",
+            "TradeType",
+            "SharesTraded",
+            "Price",
+            "Value",
+        ]
+        return df
     except Exception as e:
+        logging.error(f"Error fetching insider trades for {ticker}: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=3600)
-def fetch_stock_data(ticker: str, period: str = "6mo") -> pd.DataFrame:
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
     """
-    Fetch historical stock data for a given ticker from Yahoo Finance.
+    Return a persistent thread pool shared across Streamlit reruns.
+
+    Keeping the pool alive (instead of a per-run `with` block) lets the
+    batched GPT call be submitted as soon as its inputs arrive and keep
+    running while the charts and tables render.
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+@st.cache_resource
+def get_ticker(symbol: str) -> yf.Ticker:
+    """
+    Return a shared yf.Ticker for a symbol, reused across reruns.
+
+    fetch_stock_data and fetch_fundamentals previously each built their own
+    Ticker; sharing one object (on the pooled cached session) lets the
+    history and info endpoints reuse connections and yfinance's internal
+    state instead of instantiating twice per ticker.
+    """
+    return yf.Ticker(symbol, session=_SESSION)
+
+@st.cache_data(ttl=1800)
+def fetch_stock_data(tickers, period: str = "6mo") -> pd.DataFrame:
+    """
+    Fetch historical stock data from Yahoo Finance.
+
+    Accepts a single ticker or a list of tickers. Multiple tickers are
+    batched through yf.download (one threaded request instead of one per
+    symbol) and returned as a ticker-keyed multi-indexed DataFrame; slice
+    with history[ticker] at display time.
     """
     try:
-        stock = yf.Ticker(ticker)
-        history = stock.history(period=period)
-        return history
+        if isinstance(tickers, str) or len(tickers) == 1:
+            symbol = tickers if isinstance(tickers, str) else tickers[0]
+            stock = get_ticker(symbol)
+            history = stock.history(period=period)
+            # The chart and report only use Close and Volume; dropping the
+            # other columns and downcasting shrinks the cached entry per
+            # ticker to roughly a quarter of the full OHLCV frame.
+            if not history.empty:
+                history = history[["Close", "Volume"]].astype(
+                    {"Close": "float32", "Volume": "int64"}
+                )
+            return history
+        return yf.download(
+            list(tickers), period=period, group_by="ticker", threads=True, progress=False
+        )
     except Exception as e:
-        logging.error(f"Error fetching stock data for {ticker}: {e}")
+        logging.error(f"Error fetching stock data for {tickers}: {e}")
         return pd.DataFrame()
 
 @st.cache_data(ttl=3600)
@@ -80,45 +140,155 @@ def fetch_latest_news(ticker: str, max_news: int = 5) -> str:
     Fetch the latest financial news from Finviz for a given ticker.
     """
     url = f"https://finviz.com/quote.ashx?t={ticker}"
-    headers = {"User-Agent": "Mozilla/5.0"}
     try:
-        response = requests.get(url, headers=headers)
+        response = _SESSION.get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        news_table = soup.find("table", class_="fullview-news-outer")
-        if not news_table:
+        # XPath straight on lxml's C tree; no BS4 Tag objects are built
+        # for the rows past max_news.
+        doc = lxml_html.fromstring(response.text)
+        rows = doc.xpath('//table[contains(@class, "fullview-news-outer")]//tr')[:max_news]
+        if not rows:
             return "No recent news found."
-        news_items = news_table.find_all("tr")[:max_news]
-        return "\n".join([item.get_text(" | ").strip() for item in news_items])
+        return "\n".join(
+            " | ".join(t.strip() for t in row.itertext() if t.strip()) for row in rows
+        )
     except Exception as e:
         logging.error(f"Error fetching news for {ticker}: {e}")
         return f"Error fetching news: {e}"
 
+# Stable system prompt shared by every GPT call. OpenAI automatically caches
+# prompt prefixes, so keeping this byte-identical across calls (no f-strings,
+# no timestamps) and putting the volatile ticker/news data last lets repeat
+# invocations across tickers reuse the cached prefix at lower cost and latency.
+SYSTEM_PREAMBLE = """You are a seasoned financial analyst writing for retail investors inside an educational stock-research tool. The tool gathers live data for one ticker at a time and asks you for a sentiment read, a valuation discussion, a risk rundown, or all three at once. Follow this rubric for every request.
+
+Role and scope:
+- You analyze publicly traded companies using only the data supplied in the user message: recent news headlines, key fundamentals (Market Cap, trailing and forward P/E, EPS, dividend yield, beta, 52-week high/low), recent price history, and insider trading activity.
+- You never have access to live market data beyond what is provided, and you do not know today's date or the current price unless the message states them. If a data point is missing, blank, or marked N/A, say so rather than inventing a value, and do not substitute figures remembered from training data, which may be stale.
+- You do not give personalized investment advice, price targets presented as certainties, buy/sell/hold instructions, position-sizing suggestions, or timing calls. You may describe what professional analysts typically examine in a situation like the one presented.
+- If the supplied data is internally inconsistent (for example, a dividend yield on a company the news describes as suspending its dividend), point out the inconsistency instead of silently picking one side.
+
+Reading the supplied data:
+- News arrives as scraped headline rows, each roughly "date | headline | source". Weight recent items above older ones and ignore rows that are clearly advertisements, ticker-page boilerplate, or unrelated to the company.
+- Fundamentals arrive as label/value pairs. Large values may be abbreviated with B (billions), M (millions), or K (thousands). Dividend yield may be a fraction (0.004) or a percentage (0.4); infer the convention from magnitude and say which you assumed.
+- Insider activity, when present, is a table of filings: filing date, trade date, insider name, trade type (P - Purchase, S - Sale, and sale variants), share count, price, and total value. Open-market purchases by officers and directors are generally a stronger signal than sales, because sales are often routine diversification, tax-driven, or made under pre-arranged 10b5-1 plans.
+- Price history, when present, covers roughly the last six months of closing prices and volume. Describe the trend in plain terms (direction, rough magnitude, notable volume spikes) without inventing precise support or resistance levels.
+
+Sentiment analysis:
+- Classify the overall tone of the supplied news as bullish, bearish, or neutral, and state the classification in the first sentence.
+- Justify the classification with specific references to the headlines provided, not general market commentary. If the headlines conflict, say which ones dominate your read and why.
+- Distinguish company-specific drivers (earnings, products, litigation, management changes) from sector-wide or macro drivers (rates, regulation, commodity prices).
+- Note when coverage is too thin or too stale to support a confident call; a hedged neutral with reasons is better than a manufactured signal.
+- Close with one or two sentences on how the coverage might shape investor perception in the near term.
+
+Valuation analysis:
+- Anchor the discussion in the supplied fundamentals: relate Market Cap to the company's peer scale, interpret trailing vs. forward P/E as a growth expectation signal, and note what EPS, dividend yield, and beta imply about profitability, income, and volatility.
+- Use the 52-week high and low to frame where the current price sits in its recent range, when price information is available.
+- Flag when a metric is unusual (negative EPS, extreme or missing P/E, very high beta) and explain what typically drives such readings rather than treating the number at face value.
+- Present valuation as a range of interpretations rather than a single verdict, and name the assumptions each interpretation rests on (growth continuing, margins holding, multiples reverting toward sector norms).
+- Do not produce a specific fair-value price; characterize valuation qualitatively (e.g., priced for substantial growth, priced like a mature dividend payer).
+
+Risk factors:
+- Cover, where relevant: competitive pressure, regulatory and legal exposure, macroeconomic sensitivity (rates, inflation, FX), supply-chain or input-cost dependence, customer or product concentration, balance-sheet leverage, and execution risk on announced plans.
+- Order risks from most to least material for this company, and keep each to one or two sentences.
+- Note any risks suggested directly by the supplied news or insider activity, such as clustered insider selling, litigation headlines, or guidance cuts.
+- Distinguish risks that would impair the business itself from risks that mainly affect the stock price or its multiple.
+- Do not pad the list with generic boilerplate that applies to every public company unless the supplied data gives it specific relevance here.
+
+Style:
+- Be concise and concrete. Prefer short paragraphs and bullet points over long prose, and lead each section with its conclusion.
+- Use plain language; define any term of art (e.g., forward P/E, beta, 10b5-1 plan) in passing the first time it appears.
+- Attribute claims to the data that supports them ("the headlines from this week...", "with a trailing P/E of...") so the reader can verify against the tables shown in the app.
+- Express uncertainty honestly with calibrated wording (likely, possible, unclear from the data) instead of false precision.
+
+Output formats:
+- When asked for plain text, return well-formed Markdown with no preamble about being an AI and no repetition of these instructions.
+- When asked for JSON, return only a valid JSON object with exactly the requested keys and string values - no surrounding prose, no code fences, no trailing commentary. Each value should be complete, self-contained Markdown, since the values are rendered independently in different sections of the app.
+
+Disclaimer:
+- Every analysis is for educational purposes only and is not financial advice. Always remind the reader to do their own research and consult a qualified professional before making investment decisions."""
+
 @st.cache_data(ttl=3600)
-def generate_analysis_via_gpt(prompt: str, model: str = "gpt-3.5-turbo") -> str:
+def generate_analysis_via_gpt(prompt: str, model: str = "gpt-4o-mini") -> str:
     """
     Generate text using OpenAI's GPT model based on a given prompt.
+
+    The response is streamed into the page as tokens arrive (instead of
+    blocking for the full completion), and the concatenated text is
+    returned for reuse in the TXT report. On a cache hit Streamlit
+    replays the rendered element, so callers should not write the
+    returned string to the page again.
     """
     try:
         response = openai.ChatCompletion.create(
             model=model,
             messages=[
-                {"role": "system", "content": "You are a financial analyst."},
+                {"role": "system", "content": SYSTEM_PREAMBLE},
                 {"role": "user", "content": prompt},
-            ]
+            ],
+            stream=True,
         )
-        return response["choices"][0]["message"]["content"].strip()
+        placeholder = st.empty()
+        text = ""
+        for chunk in response:
+            delta = chunk["choices"][0].get("delta", {})
+            text += delta.get("content", "")
+            placeholder.markdown(text)
+        return text.strip()
     except Exception as e:
         logging.error(f"Error generating GPT analysis: {e}")
         return f"Error generating GPT analysis: {e}"
 
 @st.cache_data(ttl=3600)
+def generate_batched_analyses(ticker: str, news: str, fundamentals: dict, model: str = "gpt-4o-mini") -> dict:
+    """
+    Generate the sentiment, valuation, and risk analyses in one GPT call.
+
+    The three prompts share the same system message and per-ticker context,
+    so merging them cuts three round trips (and three copies of the shared
+    context) down to one. Returns a dict with "sentiment", "valuation",
+    and "risks" keys, or an empty dict on failure.
+    """
+    fundamentals_text = "\n".join(f"{k}: {v}" for k, v in fundamentals.items())
+    prompt = (
+        f"Analyze the stock {ticker} and respond with a JSON object containing "
+        'exactly three string keys: "sentiment", "valuation", and "risks".\n'
+        '- "sentiment": a sentiment analysis (bullish, bearish, or neutral) of the '
+        "news below with reasons, summarizing how it might affect investor perception.\n"
+        '- "valuation": a high-level valuation analysis considering metrics like '
+        "Market Cap, P/E ratio, growth prospects, and any risks. Make sure to "
+        "clarify that this is not financial advice.\n"
+        '- "risks": potential risk factors considering market trends, macroeconomic '
+        "conditions, industry outlook, and recent news, listed in bullet points.\n\n"
+        f"News:\n{news}\n\n"
+        f"Fundamentals:\n{fundamentals_text}"
+    )
+    try:
+        response = openai.ChatCompletion.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PREAMBLE},
+                {"role": "user", "content": prompt},
+            ],
+            response_format={"type": "json_object"},
+        )
+        content = response["choices"][0]["message"]["content"].strip()
+        # JSON mode should prevent this, but strip any code fences the
+        # model wraps around the object anyway.
+        if content.startswith("```"):
+            content = content.strip("`").removeprefix("json").strip()
+        return json.loads(content)
+    except Exception as e:
+        logging.error(f"Error generating batched GPT analyses: {e}")
+        return {}
+
+@st.cache_data(ttl=86400)
 def fetch_fundamentals(ticker: str) -> dict:
     """
     Fetch basic fundamentals from Yahoo Finance (market cap, P/E, etc.).
     """
     try:
-        stock = yf.Ticker(ticker)
+        stock = get_ticker(ticker)
         info = stock.info
         # Extract some key fundamentals safely
         fundamentals = {
@@ -139,136 +309,183 @@ def fetch_fundamentals(ticker: str) -> dict:
 
 ticker = st.text_input("Enter Stock Ticker (e.g., AAPL, TSLA, MSFT):", "").upper()
 
-if ticker:
+if ticker and ticker != st.session_state.get("rendered_ticker"):
+    # Fetch and analyze only when the ticker changes. Button clicks rerun the
+    # whole script, so everything below is stashed in st.session_state and the
+    # render block reads from there instead of recomputing.
     with st.spinner("Generating Investment Report..."):
-        # Fetch data
-        stock_data = fetch_stock_data(ticker)
-        fundamentals = fetch_fundamentals(ticker)
-        insider_trades = fetch_insider_trades(ticker)
-        news = fetch_latest_news(ticker, max_news=5)
+        # Fetch data concurrently - all four calls are I/O-bound HTTP requests
+        # to different hosts, so wall-clock time is the max rather than the sum.
+        executor = get_executor()
+        stock_future = executor.submit(fetch_stock_data, ticker)
+        fundamentals_future = executor.submit(fetch_fundamentals, ticker)
+        insider_future = executor.submit(fetch_insider_trades, ticker)
+        news_future = executor.submit(fetch_latest_news, ticker, 5)
+        st.session_state["fundamentals"] = fundamentals_future.result()
+        news = news_future.result()
+        st.session_state["news"] = news
 
-        
-        if not stock_data.empty:
-            st.subheader("📈 Stock Price & Volume Trend")
-
-            fig, ax = plt.subplots()
-            ax.plot(stock_data.index, stock_data["Close"], label="Closing Price")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Price (USD)")
-            ax2 = ax.twinx()
-            ax2.bar(stock_data.index, stock_data["Volume"], alpha=0.3, label="Volume")
-            ax2.set_ylabel("Volume")
-            ax.legend(loc="upper left")
-            ax2.legend(loc="upper right")
-            st.pyplot(fig)
-        else:
-            st.warning(f"Could not fetch stock data for '{ticker}'.")
-
-        
-        if fundamentals:
-            st.subheader("🏦 Key Fundamentals")
-            fundamentals_df = pd.DataFrame(
-                list(fundamentals.items()), columns=["Metric", "Value"]
+        # One batched GPT call covers sentiment plus the two on-demand
+        # analyses. It is submitted the moment its inputs are ready and
+        # resolved down at the sentiment section, so its latency hides
+        # behind the remaining fetches and the chart/table rendering.
+        if news and "Error" not in news:
+            st.session_state["analyses_future"] = executor.submit(
+                generate_batched_analyses, ticker, news, st.session_state["fundamentals"]
             )
-            # Format large numbers like Market Cap
-            def format_large_num(num):
-                if num is None:
-                    return "N/A"
-                elif abs(num) >= 1e9:
-                    return f"{num/1e9:.2f}B"
-                elif abs(num) >= 1e6:
-                    return f"{num/1e6:.2f}M"
-                elif abs(num) >= 1e3:
-                    return f"{num/1e3:.2f}K"
-                else:
-                    return str(round(num, 2))
-
-            fundamentals_df["Value"] = fundamentals_df["Value"].apply(format_large_num)
-            st.dataframe(fundamentals_df)
         else:
-            st.warning("Could not retrieve fundamentals for this ticker.")
+            st.session_state["analyses_future"] = None
+        st.session_state["analyses"] = {}
 
-        
-        st.subheader("📰 Latest Financial News")
-        st.write(news)
+        st.session_state["stock_data"] = stock_future.result()
+        st.session_state["insider_trades"] = insider_future.result()
+        st.session_state["rendered_ticker"] = ticker
 
-        
-        if news and "Error" not in news:
+if ticker:
+    stock_data = st.session_state["stock_data"]
+    fundamentals = st.session_state["fundamentals"]
+    insider_trades = st.session_state["insider_trades"]
+    news = st.session_state["news"]
+    analyses = st.session_state["analyses"]
+
+    if not stock_data.empty:
+        st.subheader("📈 Stock Price & Volume Trend")
+
+        # Native Streamlit charts render in the browser via Vega-Lite,
+        # so the server ships the DataFrame instead of rasterizing a
+        # matplotlib figure to PNG on every rerun.
+        st.line_chart(stock_data["Close"])
+        st.bar_chart(stock_data["Volume"])
+    else:
+        st.warning(f"Could not fetch stock data for '{ticker}'.")
+
+    if fundamentals:
+        st.subheader("🏦 Key Fundamentals")
+        # Dict-of-lists takes pandas' columnar fast path (no row-wise
+        # tuple inference).
+        fundamentals_df = pd.DataFrame(
+            {"Metric": list(fundamentals.keys()), "Value": list(fundamentals.values())}
+        )
+        # Format large numbers like Market Cap, vectorized instead of a
+        # Python apply() per row.
+        vals = pd.to_numeric(fundamentals_df["Value"], errors="coerce").to_numpy()
+        absv = np.abs(vals)
+        conds = [np.isnan(vals), absv >= 1e9, absv >= 1e6, absv >= 1e3]
+        choices = [
+            "N/A",
+            np.char.add(np.char.mod("%.2f", vals / 1e9), "B"),
+            np.char.add(np.char.mod("%.2f", vals / 1e6), "M"),
+            np.char.add(np.char.mod("%.2f", vals / 1e3), "K"),
+        ]
+        fundamentals_df["Value"] = np.select(
+            conds, choices, default=np.round(vals, 2).astype(str)
+        )
+        st.dataframe(fundamentals_df)
+    else:
+        st.warning("Could not retrieve fundamentals for this ticker.")
+
+    st.subheader("📰 Latest Financial News")
+    st.write(news)
+
+    if news and "Error" not in news:
+        # Collect the proactively submitted GPT call; by this point the
+        # chart and tables above have rendered while it ran.
+        if not analyses and st.session_state.get("analyses_future") is not None:
+            analyses = st.session_state["analyses"] = st.session_state["analyses_future"].result()
+        st.subheader("📊 AI Sentiment Analysis")
+        sentiment_analysis = analyses.get("sentiment")
+        if sentiment_analysis:
+            st.write(sentiment_analysis)
+        else:
+            # Batched call failed (or its JSON did not parse); fall back to
+            # the plain-text single prompt so sentiment always renders.
             prompt_sentiment = (
                 f"Analyze the following news articles about {ticker} and provide a sentiment "
                 "analysis (bullish, bearish, or neutral) with reasons:\n\n"
                 f"{news}\n\n"
                 "Please summarize how this might affect investor perception."
             )
+            # Streams its own output; no extra st.write needed.
             sentiment_analysis = generate_analysis_via_gpt(prompt_sentiment)
-            st.subheader("📊 AI Sentiment Analysis")
-            st.write(sentiment_analysis)
-        else:
-            st.warning("No valid news available to analyze sentiment.")
+    else:
+        st.warning("No valid news available to analyze sentiment.")
 
-        
-        st.subheader("💡 Optional: GPT Valuation Analysis")
-        st.markdown("*(This is an experimental feature. It may take a few seconds.)*")
-        if st.button("Run Valuation Analysis"):
+    st.subheader("💡 Optional: GPT Valuation Analysis")
+    st.markdown("*(This is an experimental feature. It may take a few seconds.)*")
+    if st.button("Run Valuation Analysis"):
+        valuation_analysis = analyses.get("valuation")
+        if not valuation_analysis:
             prompt_valuation = (
                 f"Using the fundamentals and recent performance of {ticker}, "
                 "provide a high-level valuation analysis. Consider metrics like "
                 "Market Cap, P/E ratio, growth prospects, and any risks. "
                 "Make sure to clarify that this is not financial advice."
             )
+            # Streams its own output; no extra st.write needed.
             valuation_analysis = generate_analysis_via_gpt(prompt_valuation)
+        else:
             st.write(valuation_analysis)
 
-        
-        st.subheader("🏛️ Insider Trading Activity")
-        if not insider_trades.empty:
-            st.dataframe(insider_trades)
-        else:
-            st.info("No recent insider trading activity found.")
+    st.subheader("🏛️ Insider Trading Activity")
+    if not insider_trades.empty:
+        st.dataframe(insider_trades)
+    else:
+        st.info("No recent insider trading activity found.")
 
-        
-        st.subheader("⚠️ Optional: GPT Risk Factors")
-        st.markdown("*(This is an experimental feature. It may take a few seconds.)*")
-        if st.button("Analyze Risk Factors"):
+    st.subheader("⚠️ Optional: GPT Risk Factors")
+    st.markdown("*(This is an experimental feature. It may take a few seconds.)*")
+    if st.button("Analyze Risk Factors"):
+        risk_factors = analyses.get("risks")
+        if not risk_factors:
             prompt_risks = (
                 f"Analyze potential risk factors for {ticker}, considering market trends, "
                 "macroeconomic conditions, industry outlook, recent news, and any relevant data. "
                 "Please list them in bullet points."
             )
+            # Streams its own output; no extra st.write needed.
             risk_factors = generate_analysis_via_gpt(prompt_risks)
+        else:
             st.write(risk_factors)
 
-        
-        if st.button("📄 Generate TXT Report"):
-            try:
-                file_name = f"{ticker}_investment_report.txt"
-                with open(file_name, "w", encoding="utf-8") as file:
-                    file.write(f"AI Investment Report for {ticker}\n\n")
-                    # Stock Data
-                    if not stock_data.empty:
-                        file.write("Recent Stock Data (Last 5 rows):\n")
-                        file.write(f"{stock_data.tail(5)}\n\n")
-
-                    # Fundamentals
-                    if fundamentals:
-                        file.write("Key Fundamentals:\n")
-                        for k, v in fundamentals.items():
-                            file.write(f"{k}: {v}\n")
-                        file.write("\n")
-
-                    # News & Sentiment
-                    file.write("Latest News:\n")
-                    file.write(f"{news}\n\n")
-                    if news and "Error" not in news:
-                        file.write("AI Sentiment Analysis:\n")
-                        file.write(f"{sentiment_analysis}\n\n")
-
-                    # Insider Trades
-                    if not insider_trades.empty:
-                        file.write("Insider Trading Activity:\n")
-                        file.write(insider_trades.to_string())
-                        file.write("\n\n")
-
-                    st.success(f"Investment report saved as {file_name}")
-            except Exception as e:
-                st.error(f"Error generating TXT report: {e}")
+    # The report is assembled in memory and served as a download - nothing
+    # is written to (or leaked on) the server's disk, and the user actually
+    # receives the file.
+    try:
+        report = io.StringIO()
+        report.write(f"AI Investment Report for {ticker}\n\n")
+        # Stock Data
+        if not stock_data.empty:
+            report.write("Recent Stock Data (Last 5 rows):\n")
+            # to_csv skips pandas' repr formatting machinery and keeps
+            # full precision.
+            report.write(stock_data.tail(5).to_csv(index=True))
+            report.write("\n")
+
+        # Fundamentals
+        if fundamentals:
+            report.write("Key Fundamentals:\n")
+            for k, v in fundamentals.items():
+                report.write(f"{k}: {v}\n")
+            report.write("\n")
+
+        # News & Sentiment
+        report.write("Latest News:\n")
+        report.write(f"{news}\n\n")
+        if news and "Error" not in news:
+            report.write("AI Sentiment Analysis:\n")
+            report.write(f"{sentiment_analysis}\n\n")
+
+        # Insider Trades
+        if not insider_trades.empty:
+            report.write("Insider Trading Activity:\n")
+            report.write(insider_trades.to_csv(index=False))
+            report.write("\n")
+
+        st.download_button(
+            "📄 Download TXT Report",
+            data=report.getvalue().encode("utf-8"),
+            file_name=f"{ticker}_investment_report.txt",
+            mime="text/plain",
+        )
+    except Exception as e:
+        st.error(f"Error generating TXT report: {e}")